@@ -0,0 +1,53 @@
+import gc
+import json
+import os
+import subprocess
+import sys
+import pdfplumber
+
+
+def count_pages(pdf_path):
+    with pdfplumber.open(pdf_path) as pdf:
+        return len(pdf.pages)
+
+
+def available_cpus():
+    # The CPUs this process may actually run on, not every core on the host
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def extract_table_rows(pdf_path, start, stop):
+    # Reopens the file and only touches its own page range, so slices can run in separate processes
+    rows = []
+    with pdfplumber.open(pdf_path) as pdf:
+        for page_num in range(start, stop):
+            page = pdf.pages[page_num]
+            table = page.extract_table()
+            # Release the cached layout so memory stays flat on long PDFs
+            page.flush_cache()
+            if (page_num + 1) % 10 == 0:
+                gc.collect()
+            if table:
+                rows.extend(table[1:])
+    return rows
+
+
+def extract_rows_in_subprocess(pdf_path, start, stop):
+    # A plain `python -m pdf_extract` child only imports this module. A multiprocessing
+    # worker would re-run the Streamlit app script, which becomes __main__ under Streamlit.
+    result = subprocess.run(
+        [sys.executable, "-m", "pdf_extract", pdf_path, str(start), str(stop)],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout)
+
+
+if __name__ == "__main__":
+    # Worker entry point: extract one page range and write its rows to stdout as JSON
+    pdf_path, start, stop = sys.argv[1], int(sys.argv[2]), int(sys.argv[3])
+    json.dump(extract_table_rows(pdf_path, start, stop), sys.stdout)
@@ -1,50 +1,192 @@
 import streamlit as st
 from google.cloud import firestore
+from google.cloud.firestore_v1.base_query import FieldFilter
 import random
 import pandas as pd
 import json
 import re
+import os
+import itertools
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 
 # --- 1. Database Setup ---
-key_dict = json.loads(st.secrets["textkey"])
-db = firestore.Client.from_service_account_info(key_dict)
+@st.cache_resource
+def get_db():
+    # One client per server process, so reruns reuse its credentials and gRPC channel
+    key_dict = json.loads(st.secrets["textkey"])
+    return firestore.Client.from_service_account_info(key_dict)
 
-def fetch_all_words():
-    docs = db.collection("vocabulary_master").stream()
+db = get_db()
+
+@st.cache_resource
+def _data_versions():
+    # Shared by every session in this server process, like the st.cache_data entries it keys.
+    # A reload or new tab sees the current version instead of restarting at 0, and the
+    # single counter never hands out a number that an older cache entry already used.
+    return {'counter': itertools.count(1), 'vocab': 0, 'sets': 0}
+
+def vocab_version():
+    return _data_versions()['vocab']
+
+def sets_version():
+    return _data_versions()['sets']
+
+@st.cache_data(ttl=600)
+def _fetch_words_cached(version, fields=None):
+    vocab_ref = db.collection("vocabulary_master")
+    # Project only the requested fields so the multi-KB meanings stay on the server
+    query = vocab_ref.select(list(fields)) if fields else vocab_ref
+    # Sort alphabetically on the server via the stored lowercase copy of the word
+    return [doc.to_dict() for doc in query.order_by('word_lower').stream()]
+
+def fetch_word_index():
+    # The version is only part of the cache key; bumping it forces a fresh read.
+    # Just enough to count the sets and draw OWS decoys.
+    return _fetch_words_cached(vocab_version(), ('word_text',))
+
+def count_words():
+    # Unlike the ordered queries, this also counts documents that are still missing word_lower
+    return db.collection("vocabulary_master").count().get()[0][0].value
+
+def fetch_word_synonyms():
+    return _fetch_words_cached(vocab_version(), ('word_text', 'synonyms'))
+
+@st.cache_data(ttl=600)
+def _fetch_set_cached(set_id, start_word, end_word, size):
+    # Keyed by the set's bounds rather than the vocab version, so answering a question
+    # doesn't re-read the set; a reindex that moves its boundaries does
+    docs = db.collection("vocabulary_master").where(filter=FieldFilter('set_id', '==', set_id)).stream()
     words = [doc.to_dict() for doc in docs]
-    # Sort alphabetically
+    # Sort alphabetically (only 25 docs, so no composite index is needed)
     return sorted(words, key=lambda x: x['word_text'].lower())
 
+def fetch_set_words(meta):
+    return _fetch_set_cached(meta['set_id'], meta['start_word'], meta['end_word'], meta['size'])
+
+@st.cache_data(ttl=600)
+def _fetch_sets_meta_cached(version):
+    docs = db.collection("sets_meta").stream()
+    return sorted((doc.to_dict() for doc in docs), key=lambda x: x['set_id'])
+
+def fetch_sets_meta():
+    return _fetch_sets_meta_cached(sets_version())
+
+def bump_vocab_version():
+    # Imports and reindexes can move every set boundary, so sets_meta is refreshed too
+    versions = _data_versions()
+    versions['vocab'] = versions['sets'] = next(versions['counter'])
+
+def bump_sets_version():
+    # Answers only change per-set attempt counts; the word list and decoy pools stay cached
+    versions = _data_versions()
+    versions['sets'] = next(versions['counter'])
+
+def commit_in_batches(writes):
+    # Firestore allows at most 500 writes per batch commit; a None payload means delete
+    for i in range(0, len(writes), 500):
+        batch = db.batch()
+        for ref, data in writes[i:i + 500]:
+            if data is None:
+                batch.delete(ref)
+            else:
+                batch.set(ref, data, merge=True)
+        batch.commit()
+
+def reindex_sets():
+    # Denormalize set membership and attempt counts into sets_meta so the quiz can label
+    # every set from one small collection instead of scanning each word's flags
+    vocab_ref = db.collection("vocabulary_master")
+    meta_ref = db.collection("sets_meta")
+    # Unordered scan, so documents imported before word_lower existed are included and backfilled
+    docs = sorted(vocab_ref.select(['word_text', 'word_lower', 'set_id', 'ows_attempted', 'syno_attempted']).stream(), key=lambda doc: doc.get('word_text').lower())
+    words = [doc.to_dict() for doc in docs]
+    
+    writes = []
+    for i, (doc, w) in enumerate(zip(docs, words)):
+        updates = {}
+        if w.get('set_id') != i // 25:
+            updates['set_id'] = i // 25
+        if w.get('word_lower') != w['word_text'].lower():
+            updates['word_lower'] = w['word_text'].lower()
+        if updates:
+            # Write through the streamed reference; a document's ID need not match its word_text
+            writes.append((doc.reference, updates))
+    
+    set_count = (len(words) + 24) // 25
+    for set_id in range(set_count):
+        s = words[set_id * 25:(set_id + 1) * 25]
+        writes.append((meta_ref.document(str(set_id)), {
+            'set_id': set_id,
+            'start_word': s[0]['word_text'],
+            'end_word': s[-1]['word_text'],
+            'size': len(s),
+            'ows_attempted_count': sum(1 for w in s if w.get('ows_attempted', False)),
+            'syno_attempted_count': sum(1 for w in s if w.get('syno_attempted', False))
+        }))
+    
+    for doc in meta_ref.select([]).stream():
+        if int(doc.id) >= set_count:
+            writes.append((doc.reference, None))
+    
+    commit_in_batches(writes)
+
+@firestore.transactional
+def _record_attempt(transaction, doc_ref, is_correct, attempted_key):
+    snapshot = doc_ref.get(transaction=transaction)
+    if not snapshot.exists:
+        return False
+    data = snapshot.to_dict()
+    
+    # Let the server do the arithmetic on the counters
+    transaction.update(doc_ref, {
+        'total_attempts': firestore.Increment(1),
+        'correct_attempts': firestore.Increment(1 if is_correct else 0),
+        attempted_key: True
+    })
+    
+    # Count each word once towards its set's completion
+    if not data.get(attempted_key, False) and data.get('set_id') is not None:
+        meta_doc = db.collection("sets_meta").document(str(data['set_id']))
+        transaction.set(meta_doc, {f"{attempted_key}_count": firestore.Increment(1)}, merge=True)
+    return True
+
 def update_score(word_text, is_correct, quiz_type):
     doc_ref = db.collection("vocabulary_master").document(word_text)
-    doc = doc_ref.get()
-    if doc.exists:
-        data = doc.to_dict()
-        new_total = data.get('total_attempts', 0) + 1
-        new_correct = data.get('correct_attempts', 0) + (1 if is_correct else 0)
-        
-        # Track which quiz type was attempted to mark sets as completed
-        attempted_key = f"{quiz_type}_attempted"
-        
-        doc_ref.update({
-            'total_attempts': new_total,
-            'correct_attempts': new_correct,
-            attempted_key: True
-        })
+    
+    # Track which quiz type was attempted to mark sets as completed
+    attempted_key = f"{quiz_type}_attempted"
+    
+    if _record_attempt(db.transaction(), doc_ref, is_correct, attempted_key):
+        bump_sets_version()
 
-# --- 2. Custom Interactive Buttons (Red/Green Logic) ---
+def pick_decoys(pool, exclude, k=3):
+    # Draw straight from the shared pool instead of copying and filtering it for every question
+    decoys = []
+    for _ in range(k * 10):
+        if len(decoys) == k or not pool:
+            break
+        candidate = random.choice(pool)
+        if candidate not in exclude and candidate not in decoys:
+            decoys.append(candidate)
+    return decoys
+
+# --- 2. Custom Interactive Options (Red/Green Logic) ---
 def render_quiz_options(options, correct_option, word_text, quiz_type):
     if st.session_state.get('answered', False):
+        # Build all four result cards into one markdown element
+        cards = []
         for opt in options:
             if opt == correct_option:
                 # Highlight correct answer in Green
-                st.markdown(f"<div style='background-color: #d4edda; color: #155724; padding: 15px; border-radius: 8px; border: 1px solid #c3e6cb; margin-bottom: 10px; font-weight: bold;'>✅ {opt}</div>", unsafe_allow_html=True)
+                cards.append(f"<div style='background-color: #d4edda; color: #155724; padding: 15px; border-radius: 8px; border: 1px solid #c3e6cb; margin-bottom: 10px; font-weight: bold;'>✅ {opt}</div>")
             elif opt == st.session_state.selected_option:
                 # Highlight chosen wrong answer in Red
-                st.markdown(f"<div style='background-color: #f8d7da; color: #721c24; padding: 15px; border-radius: 8px; border: 1px solid #f5c6cb; margin-bottom: 10px;'>❌ {opt}</div>", unsafe_allow_html=True)
+                cards.append(f"<div style='background-color: #f8d7da; color: #721c24; padding: 15px; border-radius: 8px; border: 1px solid #f5c6cb; margin-bottom: 10px;'>❌ {opt}</div>")
             else:
                 # Neutral for unselected wrong answers
-                st.markdown(f"<div style='background-color: #f8f9fa; color: #6c757d; padding: 15px; border-radius: 8px; border: 1px solid #dee2e6; margin-bottom: 10px;'>{opt}</div>", unsafe_allow_html=True)
+                cards.append(f"<div style='background-color: #f8f9fa; color: #6c757d; padding: 15px; border-radius: 8px; border: 1px solid #dee2e6; margin-bottom: 10px;'>{opt}</div>")
+        st.markdown("".join(cards), unsafe_allow_html=True)
         
         if st.button("Next Question ➡️"):
             st.session_state.current_index += 1
@@ -52,13 +194,15 @@ def render_quiz_options(options, correct_option, word_text, quiz_type):
             st.session_state.selected_option = None
             st.rerun()
     else:
-        for opt in options:
-            if st.button(opt, key=opt, use_container_width=True):
-                st.session_state.answered = True
-                st.session_state.selected_option = opt
-                is_correct = (opt == correct_option)
-                update_score(word_text, is_correct, quiz_type)
-                st.rerun()
+        # One radio widget instead of a button per option; it is not rendered once answered,
+        # so Streamlit drops its state and the next question starts unselected
+        choice = st.radio("Pick:", options, index=None, key="quiz_choice", label_visibility="collapsed")
+        if choice is not None:
+            st.session_state.answered = True
+            st.session_state.selected_option = choice
+            is_correct = (choice == correct_option)
+            update_score(word_text, is_correct, quiz_type)
+            st.rerun()
 
 # --- 3. Streamlit UI & Navigation ---
 st.set_page_config(page_title="SSC CGL Vocab Tracker", layout="centered")
@@ -77,49 +221,81 @@ if menu == "Home / Upload PDF":
     
     if uploaded_pdf is not None:
         if st.button("Extract & Add Words"):
-            import pdfplumber
+            from pdf_extract import available_cpus, count_pages, extract_rows_in_subprocess, extract_table_rows
             with st.spinner("Extracting meanings and synonyms..."):
                 vocab_ref = db.collection("vocabulary_master")
-                added_count = 0
                 
-                with pdfplumber.open(uploaded_pdf) as pdf:
-                    for page in pdf.pages:
-                        table = page.extract_table()
-                        if not table: continue
-                            
-                        for row in table[1:]:
-                            if not row or len(row) < 3: continue
-                                
-                            word_raw = str(row[1]).strip()
-                            meaning_raw = str(row[2]).strip()
-                            
-                            if not word_raw or word_raw == "Word (POS)": continue
-                                
-                            # 1. Clean the Word
-                            word_clean = word_raw.split('(')[0].strip()
-                            
-                            # 2. Split Synonyms and English Meaning
-                            # In your PDF, they are separated by a newline
-                            parts = meaning_raw.split('\n')
-                            if len(parts) >= 2:
-                                synonyms_text = parts[0].strip()
-                                english_meaning_text = " ".join(parts[1:]).strip()
-                            else:
-                                synonyms_text = "No synonyms provided"
-                                english_meaning_text = meaning_raw.strip()
-                            
-                            doc_ref = vocab_ref.document(word_clean)
-                            if not doc_ref.get().exists:
-                                doc_ref.set({
-                                    'word_text': word_clean,
-                                    'english_meaning': english_meaning_text,
-                                    'synonyms': synonyms_text,
-                                    'correct_attempts': 0,
-                                    'total_attempts': 0,
-                                    'ows_attempted': False,
-                                    'syno_attempted': False
-                                })
-                                added_count += 1
+                # 1. Extract table rows; pages are independent, so long PDFs are split into slices
+                fd, pdf_path = tempfile.mkstemp(suffix=".pdf")
+                try:
+                    with os.fdopen(fd, "wb") as tmp:
+                        tmp.write(uploaded_pdf.getbuffer())
+                    
+                    page_count = count_pages(pdf_path)
+                    # Each worker holds its own parse of the PDF, so stay at 2 even on larger hosts,
+                    # and give each at least 20 pages so startup cost is worth paying
+                    workers = min(2, available_cpus())
+                    chunk_size = max(20, -(-page_count // workers))
+                    starts = list(range(0, page_count, chunk_size))
+                    stops = [min(start + chunk_size, page_count) for start in starts]
+                    
+                    if len(starts) <= 1:
+                        rows = extract_table_rows(pdf_path, 0, page_count)
+                    else:
+                        # Threads only wait on the child processes, which do the parsing
+                        rows = []
+                        with ThreadPoolExecutor(max_workers=len(starts)) as executor:
+                            for chunk_rows in executor.map(extract_rows_in_subprocess, [pdf_path] * len(starts), starts, stops):
+                                rows.extend(chunk_rows)
+                finally:
+                    os.remove(pdf_path)
+                
+                # Fetch every existing document ID in one projected scan instead of one get() per row;
+                # words queued from this PDF join the set too, so repeated rows are skipped locally
+                seen = {d.id for d in vocab_ref.select([]).stream()}
+                
+                # 2. Clean the rows and queue new words
+                writes = []
+                for row in rows:
+                    if not row or len(row) < 3: continue
+                        
+                    word_raw = str(row[1]).strip()
+                    meaning_raw = str(row[2]).strip()
+                    
+                    if not word_raw or word_raw == "Word (POS)": continue
+                        
+                    # Clean the Word
+                    word_clean = word_raw.split('(')[0].strip()
+                    if word_clean in seen: continue
+                    seen.add(word_clean)
+                    
+                    # Split Synonyms and English Meaning
+                    # In your PDF, they are separated by a newline
+                    parts = meaning_raw.split('\n')
+                    if len(parts) >= 2:
+                        synonyms_text = parts[0].strip()
+                        english_meaning_text = " ".join(parts[1:]).strip()
+                    else:
+                        synonyms_text = "No synonyms provided"
+                        english_meaning_text = meaning_raw.strip()
+                    
+                    writes.append((vocab_ref.document(word_clean), {
+                        'word_text': word_clean,
+                        'word_lower': word_clean.lower(),
+                        'english_meaning': english_meaning_text,
+                        'synonyms': synonyms_text,
+                        'correct_attempts': 0,
+                        'total_attempts': 0,
+                        'ows_attempted': False,
+                        'syno_attempted': False
+                    }))
+                
+                commit_in_batches(writes)
+                added_count = len(writes)
+                if added_count:
+                    # New words shift the alphabetical set boundaries
+                    reindex_sets()
+                    bump_vocab_version()
                                 
                 st.success(f"✅ Success! {added_count} new words added to your quiz database.")
 
@@ -130,33 +306,60 @@ elif menu in ["OWS Quiz (Sets of 25)", "Synonym Quiz (Sets of 25)"]:
     quiz_type = "ows" if "OWS" in menu else "syno"
     st.header(f"🧠 {menu.split(' ')[0]} Practice")
     
-    all_words = fetch_all_words()
+    # Rebuild the word list and decoy pools only when the vocabulary or quiz type changes, not on every rerun
+    words_key = (vocab_version(), quiz_type)
+    if st.session_state.get('words_key') != words_key:
+        all_words = fetch_word_index()
+        
+        # Databases created before sets_meta and word_lower existed (or edited outside the app) get rebuilt once
+        word_count = count_words()
+        if len(all_words) != word_count or len(fetch_sets_meta()) != (word_count + 24) // 25:
+            reindex_sets()
+            bump_vocab_version()
+            words_key = (vocab_version(), quiz_type)
+            all_words = fetch_word_index()
+        
+        # Build the decoy pools once so questions don't rescan the whole corpus
+        if quiz_type == "ows":
+            st.session_state.word_pool = [w['word_text'] for w in all_words]
+        else:
+            st.session_state.syn_pool = [s for w in fetch_word_synonyms() for s in (x.strip() for x in w.get('synonyms', '').split(',')) if s]
+        
+        st.session_state.all_words = all_words
+        st.session_state.words_key = words_key
     
-    if not all_words:
-        st.warning("Your database is empty. Please upload a PDF first.")
-    else:
-        # Chunk into sets of 25
-        sets = [all_words[i:i + 25] for i in range(0, len(all_words), 25)]
+    # Answers only touch sets_meta, so they rebuild the labels and nothing else
+    labels_key = (sets_version(), quiz_type)
+    if st.session_state.get('labels_key') != labels_key:
+        sets_meta = fetch_sets_meta()
         
-        # Create user-friendly labels for the dropdown
-        set_options = {}
-        for i, s in enumerate(sets):
-            start_word = s[0]['word_text']
-            end_word = s[-1]['word_text']
-            
+        # Create user-friendly labels for the dropdown from the per-set summaries
+        set_labels = []
+        for meta in sets_meta:
             # Check if all words in this set have been attempted
-            is_attempted = all(w.get(f'{quiz_type}_attempted', False) for w in s)
+            is_attempted = meta.get(f'{quiz_type}_attempted_count', 0) >= meta['size']
             status = "✅ Attempted" if is_attempted else "⏳ Pending"
             
-            label = f"Set {i+1}: {start_word} to {end_word} [{status}]"
-            set_options[label] = s
-            
-        selected_set_label = st.selectbox("Choose a Practice Set:", list(set_options.keys()))
-        current_set = set_options[selected_set_label]
+            set_labels.append(f"Set {meta['set_id']+1}: {meta['start_word']} to {meta['end_word']} [{status}]")
+        
+        st.session_state.sets_meta = sets_meta
+        st.session_state.set_labels = set_labels
+        st.session_state.labels_key = labels_key
+    
+    all_words = st.session_state.all_words
+    set_labels = st.session_state.set_labels
+    
+    if not all_words:
+        st.warning("Your database is empty. Please upload a PDF first.")
+    else:
+        # Select by index so a set keeps its place when its status label changes
+        active_quiz, active_idx = st.session_state.get('active_set', (None, 0))
+        set_idx = st.selectbox("Choose a Practice Set:", range(len(set_labels)), index=min(active_idx, len(set_labels) - 1), format_func=lambda i: set_labels[i])
+        current_set = fetch_set_words(st.session_state.sets_meta[set_idx])
         
         # Quiz initialization
-        if 'active_set_label' not in st.session_state or st.session_state.active_set_label != selected_set_label:
-            st.session_state.active_set_label = selected_set_label
+        if (active_quiz, active_idx) != (quiz_type, set_idx):
+            st.session_state.active_set = (quiz_type, set_idx)
             st.session_state.current_index = 0
             st.session_state.answered = False
             
@@ -164,31 +367,22 @@ elif menu in ["OWS Quiz (Sets of 25)", "Synonym Quiz (Sets of 25)"]:
         if st.session_state.current_index < len(current_set):
             st.progress((st.session_state.current_index) / len(current_set))
             q_data = current_set[st.session_state.current_index]
+            q_key = (quiz_type, q_data['word_text'])
             
-            st.subheader(f"Question {st.session_state.current_index + 1} of {len(current_set)}")
-            
-            # Formulate Question and Options based on Quiz Type
-            if quiz_type == "ows":
-                st.info(f"**Find the word for:**\n\n{q_data.get('english_meaning', 'No meaning found')}")
-                correct_ans = q_data['word_text']
-                pool = [w['word_text'] for w in all_words if w['word_text'] != correct_ans]
-                
-            else:
-                st.info(f"**Find a synonym for:**\n\n### {q_data['word_text']}")
-                # Extract one synonym from the comma-separated string
-                syn_list = [s.strip() for s in q_data.get('synonyms', '').split(',') if s.strip()]
-                correct_ans = random.choice(syn_list) if syn_list and syn_list[0] != "No synonyms provided" else q_data.get('english_meaning', 'No synonym')
+            # Generate 4 options (1 correct, 3 decoys) once per question; reruns reuse them
+            if st.session_state.get('options_generated_for') != q_key:
+                if quiz_type == "ows":
+                    correct_ans = q_data['word_text']
+                    decoys = pick_decoys(st.session_state.word_pool, {correct_ans})
+                    
+                else:
+                    # Extract one synonym from the comma-separated string
+                    syn_list = [s.strip() for s in q_data.get('synonyms', '').split(',') if s.strip()]
+                    correct_ans = random.choice(syn_list) if syn_list and syn_list[0] != "No synonyms provided" else q_data.get('english_meaning', 'No synonym')
+                    
+                    # Get random wrong synonyms from other words
+                    decoys = pick_decoys(st.session_state.syn_pool, set(syn_list) | {correct_ans})
                 
-                # Get random wrong synonyms from other words
-                pool = []
-                for w in all_words:
-                    if w['word_text'] != q_data['word_text']:
-                        wrong_syns = [s.strip() for s in w.get('synonyms', '').split(',') if s.strip()]
-                        pool.extend(wrong_syns)
-            
-            # Generate 4 options (1 correct, 3 decoys)
-            if 'options_generated_for' not in st.session_state or st.session_state.options_generated_for != st.session_state.current_index:
-                decoys = random.sample(pool, min(len(pool), 3))
                 while len(decoys) < 3: decoys.append("None of the above")
                 
                 options = decoys + [correct_ans]
@@ -196,9 +390,17 @@ elif menu in ["OWS Quiz (Sets of 25)", "Synonym Quiz (Sets of 25)"]:
                 
                 st.session_state.current_options = options
                 st.session_state.correct_ans = correct_ans
-                st.session_state.options_generated_for = st.session_state.current_index
+                st.session_state.options_generated_for = q_key
+            
+            st.subheader(f"Question {st.session_state.current_index + 1} of {len(current_set)}")
+            
+            # Formulate Question based on Quiz Type
+            if quiz_type == "ows":
+                st.info(f"**Find the word for:**\n\n{q_data.get('english_meaning', 'No meaning found')}")
+            else:
+                st.info(f"**Find a synonym for:**\n\n### {q_data['word_text']}")
 
-            # Render the interactive red/green buttons
+            # Render the interactive red/green options
             render_quiz_options(st.session_state.current_options, st.session_state.correct_ans, q_data['word_text'], quiz_type)
 
         else: